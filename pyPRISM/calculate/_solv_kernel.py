@@ -0,0 +1,35 @@
+#!python
+r'''
+Compiled kernel for the :math:`\hat{C}(k)\hat{S}(k)\hat{C}(k)` product used in
+:func:`pyPRISM.calculate.solvation_potential`. For the small ranks typical of
+PRISM calculations, explicit loops avoid the per-matrix dispatch overhead of
+the numpy/BLAS routines. 
+
+This module is only imported when the kernel is needed, so that Numba is not
+loaded by ``import pyPRISM``. The kernel is compiled on its first call and the
+compiled code is cached on disk for later sessions. If Numba is not installed,
+csc is set to None and the numpy implementation
+(:meth:`pyPRISM.core.MatrixArray.MatrixArray.chain_dot`) is used instead.
+'''
+from __future__ import division,print_function
+
+try:
+    from numba import njit,prange
+except ImportError:
+    csc = None
+else:
+    @njit(parallel=True,cache=True,fastmath=True)
+    def csc(C,S,out):
+        '''Calculate out[k] = C[k].S[k].C[k] for every matrix in the arrays'''
+        length,rank,_ = C.shape
+        for k in prange(length):
+            for i in range(rank):
+                for m in range(rank):
+                    out[k,i,m] = 0.0
+                for l in range(rank):
+                    # element (i,l) of C[k].S[k], accumulated as a scalar
+                    CS = 0.0
+                    for j in range(rank):
+                        CS += C[k,i,j]*S[k,j,l]
+                    for m in range(rank):
+                        out[k,i,m] += CS*C[k,l,m]
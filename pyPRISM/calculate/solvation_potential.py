@@ -5,6 +5,15 @@ from pyPRISM.core.MatrixArray import MatrixArray
 from pyPRISM.core.Space import Space
 from pyPRISM.calculate.structure_factor import structure_factor
 import numpy as np
+import weakref
+
+# Largest rank for which the compiled Numba kernel (if available) is used.
+# Above this, MatrixArray.chain_dot is as fast or faster.
+_CSC_MAX_RANK = 4
+
+# Solved PRISM objects mapped to (PRISM.minimize_result, C.S.C) so that
+# repeated calls (e.g. comparing closures) do not recompute the product.
+_chain_cache = weakref.WeakKeyDictionary()
 
 def solvation_potential(PRISM,closure='HNC'):
     r'''Calculate the pairwise decomposed medium-induced solvation potential
@@ -66,6 +75,11 @@ def solvation_potential(PRISM,closure='HNC'):
         This calculation is the foundation of the Self-Consistent PRISM
         formalism. See :ref:`SCPRISM` for more information.
 
+        The product :math:`\hat{C}(k)\hat{S}(k)\hat{C}(k)` is cached for each
+        solved PRISM object, so calling this function again (e.g. with a
+        different closure) does not repeat the calculation. The cache is
+        invalidated when the PRISM object is re-solved.
+
     .. warning::
 
         Passing an unsolved PRISM object to this function will still produce
@@ -104,24 +118,49 @@ def solvation_potential(PRISM,closure='HNC'):
     '''
     
     assert PRISM.sys.rank>1,'the psi calculation is only valid for multicomponent systems'
-    
-    if PRISM.directCorr.space == Space.Real:
-        PRISM.domain.MatrixArray_to_fourier(PRISM.directCorr)
-
-    if PRISM.totalCorr.space == Space.Real:
-        PRISM.sys.domain.MatrixArray_to_fourier(PRISM.totalCorr)
-        
-    if PRISM.omega.space == Space.Real:
-        PRISM.sys.domain.MatrixArray_to_fourier(PRISM.omega)
-
-    structureFactor = structure_factor(PRISM)
-    #(PRISM.totalCorr*PRISM.sys.pairDensityMatrix + PRISM.omega)/PRISM.sys.siteDensityMatrix
 
+    if closure not in ('HNC','PY'):
+        raise ValueError('Solvation potential closure must be \'HNC\' or \'PY\', not \'{}\''.format(closure))
+
+    # minimize_result is only set (and replaced) by PRISM.solve
+    result = getattr(PRISM,'minimize_result',None)
+    cached = _chain_cache.get(PRISM)
+    if (result is not None) and (cached is not None) and (cached[0] is result):
+        psi = cached[1].get_copy()
+    else:
+        if PRISM.directCorr.space == Space.Real:
+            PRISM.sys.domain.MatrixArray_to_fourier(PRISM.directCorr)
+
+        if PRISM.totalCorr.space == Space.Real:
+            PRISM.sys.domain.MatrixArray_to_fourier(PRISM.totalCorr)
+            
+        if PRISM.omega.space == Space.Real:
+            PRISM.sys.domain.MatrixArray_to_fourier(PRISM.omega)
+
+        structureFactor = structure_factor(PRISM)
+        #(PRISM.totalCorr*PRISM.sys.pairDensityMatrix + PRISM.omega)/PRISM.sys.siteDensityMatrix
+
+        # The compiled kernel only beats the numpy contraction for small
+        # ranks. It is imported here so that Numba is only loaded when needed.
+        csc = None
+        if PRISM.sys.rank <= _CSC_MAX_RANK:
+            from pyPRISM.calculate._solv_kernel import csc
+
+        if csc is not None:
+            psi = MatrixArray(length=PRISM.sys.domain.length,rank=PRISM.sys.rank,space=Space.Fourier,types=PRISM.sys.types)
+            csc(PRISM.directCorr.data,structureFactor.data,psi.data)
+        else:
+            psi = PRISM.directCorr.chain_dot(structureFactor,PRISM.directCorr)
+
+        if result is not None:
+            _chain_cache[PRISM] = (result,psi.get_copy())
+
+    # psi is a fresh MatrixArray so it is safe to scale it in-place
     if closure == 'HNC':
-        psi = PRISM.directCorr.dot(structureFactor).dot(PRISM.directCorr) * -PRISM.sys.kT 
+        psi *= -PRISM.sys.kT 
     elif closure == 'PY':
-        psi = PRISM.directCorr.dot(structureFactor).dot(PRISM.directCorr)
-        psi.data = np.log(1 + psi.data) * -PRISM.sys.kT
+        np.log1p(psi.data,out=psi.data)
+        psi *= -PRISM.sys.kT
 
     PRISM.sys.domain.MatrixArray_to_real(psi)
 
@@ -2,7 +2,16 @@
 from __future__ import division,print_function
 from pyPRISM.core.Space import Space
 import numpy as np
-from scipy.fftpack import dst
+from scipy.fft import dst,next_fast_len
+import warnings
+import os
+from functools import lru_cache
+
+try:
+    import pyfftw
+    import pyfftw.builders
+except ImportError:
+    pyfftw = None
 
 class Domain(object):
     r'''Define domain and transform between Real and Fourier space
@@ -45,7 +54,7 @@ class Domain(object):
         The above equations describe a Real to Real, type-I discrete sine
         transform (DST). To tranform to and from Fourier space we will use the
         type-II and type-III DST's respectively. With Scipy's interface to
-        fftpack, the following functional coeffcients are
+        pocketfft (scipy.fft), the following functional coeffcients are
 
         .. math::
 
@@ -61,9 +70,31 @@ class Domain(object):
         Domain describes the discretization of Real and Fourier space
         and also sets up the functions and coefficients for transforming
         data between them.
+
+        The transforms are fastest when the grid length factors into small
+        primes (e.g. a power of two). A warning is issued if the requested
+        length does not satisfy this.
+
+        When transforming a MatrixArray, the pair-functions are transformed
+        in a single batched call that is spread over several threads (see the
+        workers argument). This requires Scipy >= 1.4.
+
+        The transforms can be carried out in single precision by specifying
+        dtype=np.float32, which roughly halves the memory traffic of each
+        transform. The grids (r, k) and the MatrixArray data remain double
+        precision; only the transform coefficients and the arrays being
+        transformed are stored in the requested precision. This is usually
+        acceptable for typical solver tolerances (~1e-5) but should be
+        checked against a double precision solution.
+
+        If pyFFTW is installed, backend='pyfftw' uses FFTW plans that are
+        measured once for each array shape and then reused. The first
+        transform of each shape is slow, but repeated transforms of the same
+        shape (e.g. every iteration of the PRISM solver) are typically faster
+        than with Scipy.
     
     '''
-    def __init__(self,length,dr=None,dk=None):
+    def __init__(self,length,dr=None,dk=None,workers=-1,backend='scipy',dtype=np.float64):
         r'''Constructor
 
         Arguments
@@ -75,8 +106,40 @@ class Domain(object):
             Grid spacing in Real space or Fourier space. Only one can be
             specified as it fixes the other.
 
+        workers: int, *optional*
+            Number of threads used for batched transforms. Negative values
+            wrap around from the number of available cores, so the default
+            of -1 uses all cores. See the documentation of scipy.fft.dst.
+
+        backend: str ('scipy' or 'pyfftw'), *optional*
+            Library used to carry out the transforms. If 'pyfftw' is requested
+            but pyFFTW is not installed, a warning is issued and 'scipy' is
+            used.
+
+        dtype: np.float32 or np.float64, *optional*
+            Floating point precision of the transforms.
+
         '''
         self._length = length
+
+        if isinstance(workers,bool) or not isinstance(workers,(int,np.integer)) or (workers == 0):
+            raise ValueError('Domain workers must be a non-zero integer, not {}'.format(workers))
+        self.workers = int(workers)
+
+        if backend not in ('scipy','pyfftw'):
+            raise ValueError('Domain backend must be \'scipy\' or \'pyfftw\', not \'{}\''.format(backend))
+        elif (backend == 'pyfftw') and (pyfftw is None):
+            warnings.warn('pyFFTW could not be imported. Using the scipy backend for transforms.')
+            backend = 'scipy'
+        self.backend = backend
+
+        # scipy.fft only computes natively in single and double precision
+        if np.dtype(dtype) not in (np.dtype(np.float32),np.dtype(np.float64)):
+            raise ValueError('Domain dtype must be np.float32 or np.float64, not {}'.format(dtype))
+        self.dtype = np.dtype(dtype)
+
+        # the grid is only built once, after all properties have been set
+        self._building = True
         
         if (dr is None) and (dk is None):
             raise ValueError('Real or Fourier grid spacing must be specified')
@@ -90,17 +153,42 @@ class Domain(object):
         elif dk is not None:
             self.dk = dk #dr is set in property setter
             
-            
-        self.build_grid() #build grid should have been called already but we'll be safe
+
+        self._building = False
+        self.build_grid()
     
     def build_grid(self):
         '''Construct the Real and Fourier Space grids and transform coefficients'''
-        self.r = np.arange(self._dr,self._dr*(self._length+1),self._dr)
-        self.k = np.arange(self.dk,self.dk*(self._length+1),self.dk)
-        self.DST_II_coeffs = 2.0*np.pi *self.r*self._dr 
-        self.DST_III_coeffs = self.k * self.dk/(4.0*np.pi*np.pi)
-        self.long_r = self.r.reshape((-1,1,1))
+        fast_length = next_fast_len(self._length,real=True)
+        if fast_length != self._length:
+            warnings.warn('Domain length {} has large prime factors and will transform slowly. Consider using length {}.'.format(self._length,fast_length))
+
+        # Building from integer indices guarantees exactly length points,
+        # which a floating point np.arange stop value does not.
+        index = np.arange(1,self._length+1,dtype=np.float64)
+        self.r = index*self._dr
+        self.k = index*self._dk
+        self.DST_II_coeffs = (2.0*np.pi *self.r*self._dr).astype(self.dtype)
+        self.DST_III_coeffs = (self.k * self.dk/(4.0*np.pi*np.pi)).astype(self.dtype)
+        self._inv_k = (1.0/self.k).astype(self.dtype)
+        self._inv_r = (1.0/self.r).astype(self.dtype)
+        self._fftw_plans = {}
     
+    def __getstate__(self):
+        # FFTW plans cannot be copied or pickled; they are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_fftw_plans'] = {}
+        return state
+
+    @property
+    def long_r(self):
+        '''Real grid reshaped to (length,1,1) for broadcasting against MatrixArray data (deprecated)'''
+        warnings.warn(
+                "long_r is deprecated and will be removed in a future release. Use r[:,None,None] instead",
+                DeprecationWarning
+        )
+        return self.r[:,None,None]
+
     @property
     def dr(self):
         '''Real grid spacing'''
@@ -109,7 +197,8 @@ class Domain(object):
     def dr(self,value):
         self._dr = value
         self._dk = np.pi/(self._dr*self._length)
-        self.build_grid()#need to re-build grid since spacing has changed
+        if not self._building:
+            self.build_grid()#need to re-build grid since spacing has changed
     
     @property
     def dk(self):
@@ -119,7 +208,8 @@ class Domain(object):
     def dk(self,value):
         self._dk = value
         self._dr = np.pi/(self._dk*self._length)
-        self.build_grid()#need to re-build grid since spacing has changed
+        if not self._building:
+            self.build_grid()#need to re-build grid since spacing has changed
         
     @property
     def length(self):
@@ -128,7 +218,8 @@ class Domain(object):
     @length.setter
     def length(self,value):
         self._length = value
-        self.build_grid()#need to re-build grid since length has changed
+        if not self._building:
+            self.build_grid()#need to re-build grid since length has changed
         
     def __repr__(self):
         return '<Domain length:{} dr/rmax:{:4.3f}/{:3.1f} dk/kmax:{:4.3f}/{:3.1f}>'.format(self.length,self.dr,self.r[-1],self.dk,self.k[-1])
@@ -154,7 +245,7 @@ class Domain(object):
         
         
         '''
-        return dst(self.DST_II_coeffs*array,type=2)/self.k
+        return self._dst(np.multiply(self.DST_II_coeffs,array,dtype=self.dtype),type=2)*self._inv_k
     
     def to_real(self,array):
         ''' Discrete Sine Transform of a numpy array 
@@ -175,8 +266,111 @@ class Domain(object):
         to go from Real-space to Fourier-space. 
         
         '''
-        return dst(self.DST_III_coeffs*array,type=3)/self.r
+        return self._dst(np.multiply(self.DST_III_coeffs,array,dtype=self.dtype),type=3)*self._inv_r
     
+    def to_fourier_batched(self,array):
+        r''' Discrete Sine Transform of each column of a 2D numpy array
+
+        Arguments
+        ---------
+        array: float ndarray, size (length,ncolumns)
+            Real-space data to be transformed, one function per column
+            
+        Returns
+        -------
+        array: float ndarray, size (length,ncolumns)
+            data transformed to fourier space
+
+        Equivalent to calling :func:`to_fourier` on each column, but all
+        columns are transformed in a single call.
+        '''
+        columns = np.array(array,dtype=self.dtype)
+        return self._scaled_dst(columns,self.DST_II_coeffs,self._inv_k,type=2)
+
+    def to_real_batched(self,array):
+        r''' Discrete Sine Transform of each column of a 2D numpy array
+
+        Arguments
+        ---------
+        array: float ndarray, size (length,ncolumns)
+            Fourier-space data to be transformed, one function per column
+            
+        Returns
+        -------
+        array: float ndarray, size (length,ncolumns)
+            data transformed to Real space
+
+        Equivalent to calling :func:`to_real` on each column, but all
+        columns are transformed in a single call.
+        '''
+        columns = np.array(array,dtype=self.dtype)
+        return self._scaled_dst(columns,self.DST_III_coeffs,self._inv_r,type=3)
+
+    def _scaled_dst(self,columns,coeffs,inv,type):
+        '''Scale, transform, and rescale a (length,ncolumns) array, which is overwritten'''
+        np.multiply(columns,coeffs[:,None],out=columns)
+        columns = self._dst(columns,type=type)
+        np.multiply(columns,inv[:,None],out=columns)
+        return columns
+
+    def _transform_pairs(self,marray,coeffs,inv,type):
+        '''Transform the pair-functions of a MatrixArray in-place'''
+        # All upper-triangle pair-functions are gathered into a single
+        # (length,npairs) block so that only one DST call is made. The
+        # gathered block is a copy, so it can be scaled in-place.
+        upper,pair_map = self._pair_indices(marray.rank)
+        data = marray.data_2d
+        pairs = data[:,upper].astype(self.dtype,copy=False)
+        pairs = self._scaled_dst(pairs,coeffs,inv,type)
+
+        # Expanding the pairs to full rows and writing them contiguously is
+        # much faster than scattering into the upper and lower columns.
+        data[...] = pairs[:,pair_map]
+
+    def _dst(self,array,type):
+        '''DST along the first axis of array, which may be overwritten'''
+        if self.backend == 'pyfftw':
+            key = (array.shape,array.dtype,type)
+            if key not in self._fftw_plans:
+                # FFTW_MEASURE overwrites the array it plans on, so plan on scratch
+                if self.workers > 0:
+                    threads = self.workers
+                else:
+                    threads = max(1,(os.cpu_count() or 1)+1+self.workers)
+                self._fftw_plans[key] = pyfftw.builders.dst(
+                    pyfftw.empty_aligned(array.shape,dtype=array.dtype),
+                    axis=0,
+                    type=type,
+                    overwrite_input=True,
+                    planner_effort='FFTW_MEASURE',
+                    threads=threads,
+                )
+            # the plan reuses its output array, so callers must get a copy
+            return self._fftw_plans[key](array).copy()
+        else:
+            return dst(array,type=type,axis=0,overwrite_x=True,workers=self.workers)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _pair_indices(rank):
+        '''Indices for gathering the upper-triangle pairs from MatrixArray.data_2d and for expanding them back
+
+        Returns
+        -------
+        upper: int ndarray, size (npairs)
+            Columns of data_2d holding the upper-triangle pair-functions
+
+        pair_map: int ndarray, size (rank*rank)
+            Pair index of each column of data_2d, such that
+            data_2d = pairs[:,pair_map]
+        '''
+        i,j = np.triu_indices(rank)
+        upper = i*rank+j
+        pair_map = np.empty(rank*rank,dtype=np.intp)
+        pair_map[upper] = np.arange(upper.shape[0])
+        pair_map[j*rank+i] = np.arange(upper.shape[0])
+        return upper,pair_map
+
     def MatrixArray_to_fourier(self,marray):
         ''' Transform all pair-functions of a MatrixArray to Fourier space in-place
 
@@ -192,9 +386,8 @@ class Domain(object):
         '''
         if marray.space == Space.Fourier:
             raise ValueError('MatrixArray is marked as already in Fourier space')
-            
-        for (i,j),(t1,t2),pair in marray.iterpairs():
-            marray[t1,t2] = self.to_fourier(pair)
+
+        self._transform_pairs(marray,self.DST_II_coeffs,self._inv_k,type=2)
         
         marray.space = Space.Fourier
             
@@ -213,9 +406,8 @@ class Domain(object):
         '''
         if marray.space == Space.Real:
             raise ValueError('MatrixArray is marked as already in Real space')
-            
-        for (i,j),(t1,t2),pair in marray.iterpairs():
-            marray[t1,t2] = self.to_real(pair)
+
+        self._transform_pairs(marray,self.DST_III_coeffs,self._inv_r,type=3)
             
         marray.space = Space.Real
             
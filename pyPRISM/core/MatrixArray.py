@@ -4,6 +4,18 @@ import string
 from itertools import product
 import numpy as np
 import warnings
+from functools import lru_cache
+
+@lru_cache(maxsize=32)
+def _chain_path(subscripts,rank):
+    '''np.einsum contraction path for a chain of (length,rank,rank) operands
+
+    Every operand shares the length dimension, so the relative cost of each
+    contraction order does not depend on it. The path is therefore found
+    once per chain and rank using single-matrix operands.
+    '''
+    operands = [np.zeros((1,rank,rank))]*(subscripts.count(',')+1)
+    return np.einsum_path(subscripts,*operands,optimize='greedy')[0]
 
 class MatrixArray(object):
     '''A container for creating and interacting with arrays of matrices
@@ -13,7 +25,9 @@ class MatrixArray(object):
         The primary data structure of MatrixArray is simply a 3D Numpy array 
         with the first dimension accessing each individual matrix in the array
         and the last two dimenions corresponding to the vertical and horizontal 
-        index of each matrix element.
+        index of each matrix element. The array is always kept C-contiguous so
+        that it can also be viewed as a 2D (length, rank*rank) array via
+        data_2d.
         
         The terminology *pair-function* is used to refer to the set of values from
         all matrices in the array at a given matrix index pair. In Numpy slicing 
@@ -93,6 +107,19 @@ class MatrixArray(object):
 
     def __repr__(self):
         return '<MatrixArray rank:{:d} length:{:d}>'.format(self.rank,self.length)
+
+    @property
+    def data(self):
+        '''(length,rank,rank) C-contiguous array of matrices'''
+        return self._data
+    @data.setter
+    def data(self,value):
+        self._data = np.ascontiguousarray(value)
+
+    @property
+    def data_2d(self):
+        '''(length,rank*rank) view of data with each matrix flattened into a row'''
+        return self._data.reshape((self._data.shape[0],-1))
     
     def get_copy(self):
         '''Return an independent copy of this MatrixArray'''
@@ -322,6 +349,39 @@ class MatrixArray(object):
             data = np.einsum('lij,ljk->lik', self.data, other.data)
             return MatrixArray(length=self.length,rank=self.rank,data=data,space=self.space,types=self.types)
         
+    def chain_dot(self,*others):
+        ''' Matrix multiplication for each matrix in a chain of MatrixArrays
+
+        Equivalent to ``self.dot(others[0]).dot(others[1])...`` but the
+        whole chain is evaluated in a single contraction so that the cheapest
+        multiplication order is used and fewer intermediates are allocated.
+        The contraction path is found once and reused for subsequent chains
+        of the same rank.
+        
+        Parameters
+        ----------
+        others: MatrixArray
+            MatrixArrays of the same length and rank to multiply, in order,
+            with this MatrixArray
+
+        Returns
+        -------
+        result: MatrixArray
+            New MatrixArray containing the chained product
+        
+        '''
+        for other in others:
+            assert (self.space == other.space) or (Space.NonSpatial in (self.space,other.space)),MatrixArray.SpaceError
+
+        # e.g. '...ab,...bc,...cd->...ad' for a chain of three MatrixArrays
+        indices = string.ascii_letters[:len(others)+2]
+        subscripts = ','.join('...'+indices[n]+indices[n+1] for n in range(len(others)+1))
+        subscripts += '->...'+indices[0]+indices[-1]
+
+        operands = [self.data] + [other.data for other in others]
+        data = np.einsum(subscripts,*operands,optimize=_chain_path(subscripts,self.rank))
+        return MatrixArray(length=self.length,rank=self.rank,data=data,space=self.space,types=self.types)
+        
     def __matmul__(self,other):
         assert (self.space == other.space) or (Space.NonSpatial in (self.space,other.space)),MatrixArray.SpaceError
         return self.dot(other,inplace=False)
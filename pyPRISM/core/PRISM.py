@@ -136,10 +136,9 @@ class PRISM:
         '''
         self.x = x #store input
 
-        # The np.copy is important otherwise x saves state between calls to
-        # this function.
-        self.GammaIn.data = np.copy(x.reshape((-1,self.sys.rank,self.sys.rank)))
-        self.GammaIn     /= self.sys.domain.long_r
+        # The division allocates a new array, which is important otherwise x
+        # saves state between calls to this function.
+        self.GammaIn.data = np.divide(x.reshape((-1,self.sys.rank,self.sys.rank)),self.sys.domain.r[:,None,None])
         
         # directCorr is calculated directly in Real space but immediately 
         # inverted to Fourier space. We must reset this from the last call.
@@ -166,7 +165,8 @@ class PRISM:
         
         self.sys.domain.MatrixArray_to_real(self.GammaOut)
         
-        self.y = self.sys.domain.long_r*(self.GammaOut.data - self.GammaIn.data)
+        self.y = self.GammaOut.data - self.GammaIn.data
+        np.multiply(self.y,self.sys.domain.r[:,None,None],out=self.y)
         
         return self.y.reshape((-1,))
     def solve(self,guess=None,method='krylov',options=None):
@@ -1,8 +1,10 @@
 #!python
 from __future__ import division,print_function
 import pyPRISM
+from pyPRISM.calculate._solv_kernel import csc
 import numpy as np
 import unittest
+import sys as _sys
 
 class CalcPRISM_TestCase(unittest.TestCase):
     def setup(self):
@@ -65,6 +67,63 @@ class CalcPRISM_TestCase(unittest.TestCase):
         PRISM.solve(options={'disp':False})
         result = pyPRISM.calculate.solvation_potential(PRISM)
 
+    def test_solvation_potential_repeat(self):
+        '''Do repeated psi calculations give the same result?'''
+        PRISM = self.setup()
+        PRISM.solve(options={'disp':False})
+        HNC1 = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+        PY   = pyPRISM.calculate.solvation_potential(PRISM,closure='PY')
+        HNC2 = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+        np.testing.assert_array_almost_equal(HNC1.data,HNC2.data)
+        
+        # modifying the result must not modify the cached calculation
+        HNC2 *= 2.0
+        HNC3 = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+        np.testing.assert_array_almost_equal(HNC1.data,HNC3.data)
+
+        with self.assertRaises(ValueError):
+            pyPRISM.calculate.solvation_potential(PRISM,closure='MSA')
+
+        # re-solving must recompute rather than use the cached calculation,
+        # so poison the cache and check that it is not used
+        module = _sys.modules['pyPRISM.calculate.solvation_potential']
+        module._chain_cache[PRISM][1].data[:] = 0.0
+        PRISM.solve(options={'disp':False})
+        HNC4 = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+        np.testing.assert_array_almost_equal(HNC1.data,HNC4.data)
+        self.assertIs(module._chain_cache[PRISM][0],PRISM.minimize_result)
+
+    @unittest.skipUnless(csc is not None,'Numba is not installed')
+    def test_csc_kernel(self):
+        '''Does the compiled C.S.C kernel match chained dot products?'''
+        length = 100
+        for rank in [2,3,8]:
+            MA1 = pyPRISM.MatrixArray(length=length,rank=rank,data=np.random.random((length,rank,rank)))
+            MA2 = pyPRISM.MatrixArray(length=length,rank=rank,data=np.random.random((length,rank,rank)))
+            
+            out = np.full((length,rank,rank),np.nan)
+            csc(MA1.data,MA2.data,out)
+            np.testing.assert_array_almost_equal(out,MA1.dot(MA2).dot(MA1).data)
+
+    @unittest.skipUnless(csc is not None,'Numba is not installed')
+    def test_solvation_potential_kernel(self):
+        '''Does psi match with and without the compiled kernel?'''
+        module = _sys.modules['pyPRISM.calculate.solvation_potential']
+        max_rank = module._CSC_MAX_RANK
+        try:
+            PRISM = self.setup()
+            PRISM.solve(options={'disp':False})
+            module._CSC_MAX_RANK = 0
+            numpy_psi = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+
+            PRISM = self.setup()
+            PRISM.solve(options={'disp':False})
+            module._CSC_MAX_RANK = max_rank
+            kernel_psi = pyPRISM.calculate.solvation_potential(PRISM,closure='HNC')
+        finally:
+            module._CSC_MAX_RANK = max_rank
+        np.testing.assert_array_almost_equal(numpy_psi.data,kernel_psi.data)
+
     def test_spinodal(self):
         '''Can we calculate spinodal conditions?'''
         PRISM = self.setup()
@@ -3,8 +3,15 @@ from __future__ import division,print_function
 from pyPRISM.core.MatrixArray import MatrixArray
 from pyPRISM.core.Domain import Domain
 import unittest
+import warnings
+from copy import deepcopy
 import numpy as np
 
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
 class Domain_TestCase(unittest.TestCase):
     def test_MatrixArray_loop(self):
         '''Can we transform an entire MatrixArray?'''
@@ -39,6 +46,40 @@ class Domain_TestCase(unittest.TestCase):
         np.testing.assert_array_almost_equal(MA['C','B'],array3)
         np.testing.assert_array_almost_equal(MA['C','C'],array4)
         
+    def test_MatrixArray_reuse(self):
+        '''Can one Domain transform several MatrixArrays of different rank?'''
+        length = 1024
+        d = Domain(length=length,dr=0.1)
+        array = np.sin(np.arange(0,10*np.pi,0.01))[:length]
+        
+        MA2 = MatrixArray(length=length,rank=2)
+        MA2['A','B'] = array
+        MA3 = MatrixArray(length=length,rank=3)
+        MA3['B','C'] = 2.0*array
+        
+        d.MatrixArray_to_fourier(MA2)
+        d.MatrixArray_to_fourier(MA3)
+        np.testing.assert_array_almost_equal(MA2['A','B'],d.to_fourier(array))
+        np.testing.assert_array_almost_equal(MA3['C','B'],d.to_fourier(2.0*array))
+        
+        d.MatrixArray_to_real(MA2)
+        d.MatrixArray_to_real(MA3)
+        np.testing.assert_array_almost_equal(MA2['B','A'],array)
+        np.testing.assert_array_almost_equal(MA3['B','C'],2.0*array)
+        np.testing.assert_array_almost_equal(MA3['A','A'],np.zeros(length))
+        
+    def test_batched(self):
+        '''Do batched transforms match column-by-column transforms?'''
+        length = 1024
+        d = Domain(length=length,dr=0.1)
+        x = np.arange(0,10*np.pi,0.01)[:length]
+        columns = np.stack([np.sin(x),5*np.sin(x),np.cos(x)],axis=1)
+        
+        fourier_space_data = d.to_fourier_batched(columns)
+        for i in range(columns.shape[1]):
+            np.testing.assert_array_almost_equal(fourier_space_data[:,i],d.to_fourier(columns[:,i]))
+        np.testing.assert_array_almost_equal(d.to_real_batched(fourier_space_data),columns)
+        
     def test_array_loop(self):
         '''Can we go to Fourier space and back again?'''
         d = Domain(length=1024,dr=0.1)
@@ -53,6 +94,134 @@ class Domain_TestCase(unittest.TestCase):
         # precision) the same array we started with.
         np.testing.assert_array_almost_equal(real_space_data1,real_space_data2)
 
+    def test_grid_rebuild(self):
+        '''Is the grid rebuilt when the spacing is changed?'''
+        d = Domain(length=1024,dr=0.1)
+        np.testing.assert_array_almost_equal(d.r,np.arange(1,1025)*0.1)
+
+        d.dr = 0.05
+        np.testing.assert_array_almost_equal(d.r,np.arange(1,1025)*0.05)
+        np.testing.assert_array_almost_equal(d.k,np.arange(1,1025)*np.pi/(0.05*1024))
+
+    def test_grid_length(self):
+        '''Do the grids always have exactly length points?'''
+        for length in [10,100,1000,1024,4096]:
+            for dr in [0.01,0.03,0.1,0.3,1.0/3.0]:
+                d = Domain(length=length,dr=dr)
+                self.assertEqual(d.r.shape[0],length)
+                self.assertEqual(d.k.shape[0],length)
+
+    def test_single_precision(self):
+        '''Can we transform in single precision?'''
+        length = 1024
+        d = Domain(length=length,dr=0.1,dtype=np.float32)
+        d64 = Domain(length=length,dr=0.1)
+        array = np.sin(np.arange(0,10*np.pi,0.01))[:length]
+        
+        fourier_space_data = d.to_fourier(array)
+        self.assertEqual(fourier_space_data.dtype,np.float32)
+        np.testing.assert_allclose(fourier_space_data,d64.to_fourier(array),rtol=1e-3,atol=1e-4)
+        np.testing.assert_allclose(d.to_real(fourier_space_data),array,atol=1e-4)
+        
+        MA = MatrixArray(length=length,rank=2)
+        MA['A','B'] = array
+        d.MatrixArray_to_fourier(MA)
+        d.MatrixArray_to_real(MA)
+        self.assertEqual(MA.data.dtype,np.float64)
+        np.testing.assert_allclose(MA['B','A'],array,atol=1e-4)
+
+        for dtype in [np.int64,np.float16,np.complex128]:
+            with self.assertRaises(ValueError):
+                Domain(length=length,dr=0.1,dtype=dtype)
+
+    def test_workers(self):
+        '''Are transform thread counts validated?'''
+        for workers in [0,1.5,None,True]:
+            with self.assertRaises(ValueError):
+                Domain(length=1024,dr=0.1,workers=workers)
+
+        MA = MatrixArray(length=1024,rank=2)
+        MA['A','B'] = np.sin(np.arange(0,10*np.pi,0.01))[:1024]
+        for workers in [1,2,-1]:
+            Domain(length=1024,dr=0.1,workers=workers).MatrixArray_to_fourier(MA.get_copy())
+
+    def test_backend(self):
+        '''Are transform backends validated?'''
+        with self.assertRaises(ValueError):
+            Domain(length=1024,dr=0.1,backend='fftpack')
+
+        # falls back to scipy if pyFFTW is not available
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            d = Domain(length=1024,dr=0.1,backend='pyfftw')
+        if pyfftw is None:
+            self.assertEqual(d.backend,'scipy')
+        else:
+            self.assertEqual(d.backend,'pyfftw')
+        
+        real_space_data1 = np.sin(np.arange(0,10*np.pi,0.01))[:1024]
+        real_space_data2 = d.to_real(d.to_fourier(real_space_data1))
+        np.testing.assert_array_almost_equal(real_space_data1,real_space_data2)
+        
+        # transform plans must not prevent copying
+        d2 = deepcopy(d)
+        real_space_data2 = d2.to_real(d2.to_fourier(real_space_data1))
+        np.testing.assert_array_almost_equal(real_space_data1,real_space_data2)
+
+    @unittest.skipUnless(pyfftw is not None,'pyFFTW is not installed')
+    def test_pyfftw_backend(self):
+        '''Does the pyFFTW backend match the scipy backend?'''
+        length = 1024
+        rank = 3
+        d = Domain(length=length,dr=0.1,backend='pyfftw')
+        ds = Domain(length=length,dr=0.1,backend='scipy')
+        self.assertEqual(d.backend,'pyfftw')
+        
+        x = np.arange(0,10*np.pi,0.01)[:length]
+        array = np.sin(x)
+        np.testing.assert_allclose(d.to_fourier(array),ds.to_fourier(array),rtol=1e-10,atol=1e-12)
+        np.testing.assert_allclose(d.to_real(array),ds.to_real(array),rtol=1e-10,atol=1e-12)
+        
+        data = np.random.random((length,rank,rank))
+        data = data + data.transpose((0,2,1))
+        MA = MatrixArray(length=length,rank=rank,data=np.copy(data))
+        MAs = MatrixArray(length=length,rank=rank,data=np.copy(data))
+        d.MatrixArray_to_fourier(MA)
+        ds.MatrixArray_to_fourier(MAs)
+        np.testing.assert_allclose(MA.data,MAs.data,rtol=1e-10,atol=1e-12)
+        d.MatrixArray_to_real(MA)
+        ds.MatrixArray_to_real(MAs)
+        np.testing.assert_allclose(MA.data,MAs.data,rtol=1e-10,atol=1e-12)
+        
+        # consecutive calls must not return the same (plan-owned) memory
+        columns = np.stack([np.sin(x),np.cos(x)],axis=1)
+        a = d.to_fourier_batched(columns)
+        b = d.to_fourier_batched(5*columns)
+        self.assertFalse(np.shares_memory(a,b))
+        np.testing.assert_allclose(a,ds.to_fourier_batched(columns),rtol=1e-10,atol=1e-12)
+        np.testing.assert_allclose(b,ds.to_fourier_batched(5*columns),rtol=1e-10,atol=1e-12)
+
+    def test_long_r(self):
+        '''Is long_r still available but deprecated?'''
+        d = Domain(length=1024,dr=0.1)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            long_r = d.long_r
+            self.assertTrue(any(issubclass(i.category,DeprecationWarning) for i in w))
+        np.testing.assert_array_almost_equal(long_r,d.r.reshape((-1,1,1)))
+
+    def test_slow_length_warning(self):
+        '''Are we warned about grid lengths that transform slowly?'''
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            Domain(length=1024,dr=0.1)
+            self.assertEqual(len(w),0)
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            Domain(length=1021,dr=0.1)
+            self.assertTrue(len(w)>0)
+
 if __name__ == '__main__':
     import unittest 
     suite = unittest.TestLoader().loadTestsFromTestCase(Domain_TestCase)
@@ -23,6 +23,18 @@ class MatrixArray_TestCase(unittest.TestCase):
         array[:,2,1] = np.ones(length)*3.0
         np.testing.assert_array_almost_equal(MA.data,array)
         
+    def test_data_2d(self):
+        '''Is the data contiguous and viewable as a 2D array?'''
+        length = 100
+        rank = 3
+        data = np.random.random((rank,rank,length)).transpose((2,0,1))
+        MA = MatrixArray(length=length,rank=rank,data=data)
+        self.assertTrue(MA.data.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_almost_equal(MA.data,data)
+
+        MA.data_2d[:,1] = 5.0
+        np.testing.assert_array_almost_equal(MA.data[:,0,1],np.ones(length)*5.0)
+        
     def test_div(self):
         '''Can we truediv and itruediv?'''
         
@@ -198,6 +210,31 @@ class MatrixArray_TestCase(unittest.TestCase):
         MA1.dot(MA2,inplace=True)
         np.testing.assert_array_almost_equal(MA1.data,MA3.data)
         
+    def test_chain_dot(self):
+        '''Can we matrix multiply a chain of MatrixArrays?'''
+        
+        length = 100
+        rank = 3
+        (MA1,MA2),(array1,array2) = self.set_up_test_arrays(length,rank)
+        
+        MA3 = MA1.chain_dot(MA2,MA1)
+        
+        array3 = np.empty_like(array1)
+        for i in range(length):
+            array3[i] = np.dot(np.dot(array1[i],array2[i]),array1[i])
+        
+        np.testing.assert_array_almost_equal(MA1.data,array1)
+        np.testing.assert_array_almost_equal(MA2.data,array2)
+        np.testing.assert_array_almost_equal(MA3.data,array3)
+        np.testing.assert_array_almost_equal(MA3.data,MA1.dot(MA2).dot(MA1).data)
+
+        # long chains must not reuse the index letters
+        MA4 = MA1.chain_dot(*([MA2,MA1]*6))
+        array4 = np.copy(array1)
+        for i in range(6):
+            array4 = np.einsum('lij,ljk->lik',np.einsum('lij,ljk->lik',array4,array2),array1)
+        np.testing.assert_allclose(MA4.data,array4)
+        
     def test_iterpairs(self):
         ''' Can we iterate over the pair-functions?'''
         length = 100
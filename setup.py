@@ -87,9 +87,6 @@ setup(
 		'Operating System :: Microsoft',
 		'Operating System :: Unix',
 		'Programming Language :: Python',
-		'Programming Language :: Python :: 2',
-		'Programming Language :: Python :: 2.7',
-		'Programming Language :: Python :: 2 :: Only',
 		'Programming Language :: Python :: 3',
 		'Programming Language :: Python :: 3.5',
 		'Programming Language :: Python :: 3.6',
@@ -104,7 +101,8 @@ setup(
 		'Source': 'https://github.com/usnistgov/pyprism',
 		'Documentation': 'http://pyPRISM.readthedocs.io',
 	},
-    install_requires = ['numpy>=1.8.0','scipy','Cython','pint'],
+    python_requires = '>=3.5',
+    install_requires = ['numpy>=1.8.0','scipy>=1.4.0','Cython','pint'],
     packages=find_packages(where='.'),
     package_data={'pyPRISM':['test/data/*dat','test/data/*csv']},
 	ext_modules= ext_modules,